@@ -21,9 +21,13 @@ import importlib
 import json
 import logging
 import os
+import queue
 import re
 import subprocess
 import sys
+import threading
+import time
+from typing import Optional
 
 # Configure logging early so dependency checks can log
 logging.basicConfig(
@@ -131,15 +135,24 @@ def ensure_dependencies(db_type: str = "sqlite"):
 
 def _load_app_modules():
     """Import application modules after dependencies are verified."""
-    global uvicorn, start_syslog_server, fastapi_app, set_database, broadcast_log
+    global uvicorn, start_syslog_server_threaded, fastapi_app, set_database, LogEntry
+    global has_ws_clients, serialize_entry, publish_payloads, set_shutdown_handler
     import uvicorn as _uvicorn
     uvicorn = _uvicorn
-    from syslog_server import start_syslog_server as _syslog
-    start_syslog_server = _syslog
-    from web_server import app as _app, set_database as _set_db, broadcast_log as _broadcast
+    from syslog_server import start_syslog_server_threaded as _syslog
+    start_syslog_server_threaded = _syslog
+    from syslog_parser import LogEntry as _entry
+    LogEntry = _entry
+    from web_server import app as _app, set_database as _set_db
+    from web_server import has_ws_clients as _has_clients, serialize_entry as _serialize
+    from web_server import publish_payloads as _publish
+    from web_server import set_shutdown_handler as _set_shutdown
     fastapi_app = _app
     set_database = _set_db
-    broadcast_log = _broadcast
+    set_shutdown_handler = _set_shutdown
+    has_ws_clients = _has_clients
+    serialize_entry = _serialize
+    publish_payloads = _publish
 
 
 def parse_args():
@@ -154,6 +167,10 @@ def parse_args():
         "--web-port", type=int, default=8080,
         help="HTTP port for the web UI (default: 8080)"
     )
+    parser.add_argument(
+        "--udp-workers", type=int, default=1,
+        help="UDP receive threads; more than 1 binds one SO_REUSEPORT socket each (default: 1)"
+    )
     parser.add_argument(
         "--host", type=str, default="0.0.0.0",
         help="Bind address (default: 0.0.0.0)"
@@ -170,30 +187,116 @@ def parse_args():
 
 
 class LogRouter:
-    """Routes incoming UDP messages to database and WebSocket clients."""
+    """Routes incoming UDP messages to database and WebSocket clients.
+
+    Messages are queued by the UDP handler and written by a dedicated thread
+    in batches, so each datagram no longer pays for its own commit.
+    """
+
+    QUEUE_SIZE = 100000
+    BATCH_SIZE = 500
+    BATCH_WAIT = 0.005  # seconds to keep collecting after the first entry
+    HOST_FLUSH_INTERVAL = 5.0  # seconds between known_hosts flushes
+    HOST_FLUSH_MESSAGES = 10000  # ...or after this many messages, if sooner
 
     def __init__(self, db, loop: asyncio.AbstractEventLoop):
         self.db = db
         self.loop = loop
+        self.queue: queue.Queue = queue.Queue(maxsize=self.QUEUE_SIZE)
         self._count = 0
+        self._dropped = 0
+        self._unflushed = 0
+        self._next_host_flush = 0.0
+        self._writer: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start the background database writer thread."""
+        self._writer = threading.Thread(
+            target=self._writer_loop, name="fetchlog-writer", daemon=True)
+        self._writer.start()
+
+    def stop(self):
+        """Write out every queued entry, then stop the writer thread."""
+        if self._writer is None:
+            return
+        pending = self.queue.qsize()
+        if pending:
+            logger.info("Writing %d queued messages before exit", pending)
+        self.queue.put(None)
+        self._writer.join()
+        self._writer = None
+
+    def on_message(self, entry: "LogEntry"):
+        """Called by the UDP receive threads for each received message."""
+        try:
+            self.queue.put_nowait(entry)
+        except queue.Full:
+            LogEntry.release(entry)
+            self._dropped += 1
+            if self._dropped % 1000 == 1:
+                logger.warning("Write queue full, dropped %d messages so far", self._dropped)
+
+    def _next_batch(self) -> tuple[list["LogEntry"], bool]:
+        """Wait for one entry, then gather more for up to BATCH_WAIT seconds."""
+        try:
+            first = self.queue.get(timeout=self.HOST_FLUSH_INTERVAL)
+        except queue.Empty:
+            return [], False
+        if first is None:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.BATCH_WAIT
+        while len(batch) < self.BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            try:
+                entry = self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is None:
+                return batch, True
+            batch.append(entry)
+        return batch, False
+
+    def _writer_loop(self):
+        self._next_host_flush = time.monotonic() + self.HOST_FLUSH_INTERVAL
+        stopping = False
+        while not stopping:
+            batch, stopping = self._next_batch()
+            if batch:
+                self._write_batch(batch)
+            if (stopping or self._unflushed >= self.HOST_FLUSH_MESSAGES
+                    or time.monotonic() >= self._next_host_flush):
+                self._flush_hosts()
+
+    def _flush_hosts(self):
+        try:
+            self.db.flush_hosts()
+        except Exception:
+            logger.exception("Error updating known hosts")
+        self._unflushed = 0
+        self._next_host_flush = time.monotonic() + self.HOST_FLUSH_INTERVAL
 
-    def on_message(self, entry: dict):
-        """Called by the UDP server for each received message."""
+    def _write_batch(self, batch: list["LogEntry"]):
         try:
-            row_id = self.db.insert_log(entry)
-            self._count += 1
+            ids = self.db.insert_logs_batch(batch)
+            before = self._count
+            self._count += len(ids)
+            self._unflushed += len(ids)
 
-            if self._count % 1000 == 0:
+            if self._count // 1000 != before // 1000:
                 logger.info("Processed %d messages total", self._count)
 
-            # Fetch the full row from DB so the WebSocket message has
-            # the same shape as /api/logs responses (all columns present)
-            rows = self.db.get_entries_after(row_id - 1, limit=1)
-            if rows:
-                self.loop.create_task(broadcast_log(rows[0]))
+            # insert_logs_batch filled in id/received_at, so each entry now
+            # matches its /api/logs row; serialize here, off the event loop
+            if has_ws_clients():
+                publish_payloads([serialize_entry(entry) for entry in batch], self.loop)
 
         except Exception:
-            logger.exception("Error routing message")
+            logger.exception("Error routing %d messages", len(batch))
+        finally:
+            # Broadcasts hold serialized copies, so entries can be recycled now
+            for entry in batch:
+                LogEntry.release(entry)
 
 
 async def run_app(args, db_config: dict):
@@ -207,23 +310,42 @@ async def run_app(args, db_config: dict):
     else:
         from database import LogDatabase
         sqlite_path = db_config.get("sqlite_path", "logs.db")
-        db = LogDatabase(sqlite_path)
+        db = LogDatabase(sqlite_path,
+                         search_index=bool(db_config.get("sqlite_search_index", False)))
         db_label = sqlite_path
     set_database(db)
     logger.info("Database initialized: %s", db_label)
 
     loop = asyncio.get_running_loop()
     router = LogRouter(db, loop)
+    router.start()
 
-    # Start UDP syslog server
-    transport, protocol = await start_syslog_server(
+    # Start UDP syslog server on its own receive threads
+    receiver = start_syslog_server_threaded(
         on_message=router.on_message,
         host=args.host,
         port=args.udp_port,
-        loop=loop,
+        workers=max(1, args.udp_workers),
     )
     logger.info("UDP syslog server listening on %s:%d", args.host, args.udp_port)
 
+    stopped = False
+
+    async def shutdown():
+        """Stop intake, then write out queued entries and host counts."""
+        nonlocal stopped
+        if stopped:
+            return
+        stopped = True
+        receiver.close()
+        logger.info("Shutting down...")
+        await loop.run_in_executor(None, router.stop)
+
+    # Runs from the web server's shutdown, which uvicorn completes before
+    # re-raising SIGTERM (systemctl stop); the finally below covers startup
+    # failures
+    set_shutdown_handler(shutdown)
+
     # Start web server using uvicorn
     config = uvicorn.Config(
         fastapi_app,
@@ -250,14 +372,17 @@ async def run_app(args, db_config: dict):
 ║                                                      ║
 ║  Send raw UDP:                                       ║
 ║    echo "hello" | nc -u 127.0.0.1 {args.udp_port:<18}║
+║                                                      ║
+║  High-volume tuning (as root):                       ║
+║    sysctl -w net.core.rmem_max=12582912              ║
+║    sysctl -w net.core.netdev_max_backlog=5000        ║
 ╚══════════════════════════════════════════════════════╝
 """)
 
     try:
         await server.serve()
     finally:
-        transport.close()
-        logger.info("Shutting down...")
+        await shutdown()
 
 
 def main():
@@ -2,32 +2,108 @@
 SQLite database layer for FetchLog.
 
 Uses WAL mode for high-throughput concurrent writes from many devices.
+Reads go through a small pool of read-only connections so web queries run
+alongside the writer instead of queueing on one connection.
 """
 
+import logging
+import os
+import queue
+import re
 import sqlite3
 import threading
 import time
+from contextlib import contextmanager
 from datetime import datetime
 from typing import Optional
+from urllib.request import pathname2url
+
+from syslog_parser import LogEntry
+
+logger = logging.getLogger("fetchlog.db")
+
+READ_POOL_SIZE = 4
+READ_POOL_TIMEOUT = 30  # seconds to wait for a free read connection
+MMAP_SIZE = 1024 * 1024 * 1024  # 1GB
+
+# Kept as one string object so sqlite3's statement cache reuses the
+# prepared statement for every batch
+INSERT_SQL = """
+    INSERT INTO log_entries
+        (timestamp, received_at, source_ip, source_port, hostname,
+         facility, severity, priority, app_name, proc_id, msg_id,
+         message, raw_message, is_syslog, is_marker, marker_style)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def _has_trigram(search: str) -> bool:
+    """
+    True if the search term has a run of at least three non-wildcard
+    characters. Shorter runs can't use the trigram index, and SQLite 3.40
+    then returns no rows for non-ASCII terms instead of scanning.
+    """
+    return max(len(run) for run in re.split(r"[%_]", search)) >= 3
 
 
 class LogDatabase:
-    def __init__(self, db_path: str = "logs.db"):
+    def __init__(self, db_path: str = "logs.db", search_index: bool = False):
         self.db_path = db_path
+        self.search_index = search_index
         self._local = threading.local()
+        # known_hosts changes accumulated in memory until flush_hosts()
+        self._host_cache: dict[str, dict] = {}
+        self._host_lock = threading.Lock()
         self._init_db()
+        self._read_pool: queue.Queue = queue.Queue(maxsize=READ_POOL_SIZE)
+        for _ in range(READ_POOL_SIZE):
+            self._read_pool.put(self._open_read_conn())
 
     def _get_conn(self) -> sqlite3.Connection:
+        """Per-thread read/write connection, used for inserts and updates."""
         if not hasattr(self._local, "conn") or self._local.conn is None:
             conn = sqlite3.connect(self.db_path, timeout=30)
+            # Only takes effect on a new database, and must precede WAL mode
+            conn.execute("PRAGMA page_size=8192")
             conn.execute("PRAGMA journal_mode=WAL")
             conn.execute("PRAGMA synchronous=NORMAL")
             conn.execute("PRAGMA cache_size=-64000")  # 64MB cache
             conn.execute("PRAGMA busy_timeout=5000")
+            # Checkpoint every ~10000 pages instead of 1000, so bursts of
+            # commits don't keep stopping to copy the WAL back
+            conn.execute("PRAGMA wal_autocheckpoint=10000")
+            self._tune_conn(conn)
             conn.row_factory = sqlite3.Row
             self._local.conn = conn
         return self._local.conn
 
+    def _open_read_conn(self) -> sqlite3.Connection:
+        uri = f"file:{pathname2url(os.path.abspath(self.db_path))}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA cache_size=-64000")  # 64MB cache
+        self._tune_conn(conn)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @staticmethod
+    def _tune_conn(conn: sqlite3.Connection):
+        # Read through a memory map instead of read() calls (capped at the
+        # file size) and keep sort/temp b-trees for ORDER BY in RAM
+        conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+
+    @contextmanager
+    def read_conn(self):
+        """Check out a read-only connection from the pool."""
+        try:
+            conn = self._read_pool.get(timeout=READ_POOL_TIMEOUT)
+        except queue.Empty:
+            raise TimeoutError("no free database read connection") from None
+        try:
+            yield conn
+        finally:
+            self._read_pool.put(conn)
+
     def _init_db(self):
         conn = self._get_conn()
         conn.executescript("""
@@ -52,12 +128,16 @@ class LogDatabase:
             );
 
             CREATE INDEX IF NOT EXISTS idx_timestamp ON log_entries(timestamp);
-            CREATE INDEX IF NOT EXISTS idx_received_at ON log_entries(received_at);
             CREATE INDEX IF NOT EXISTS idx_source_ip ON log_entries(source_ip);
             CREATE INDEX IF NOT EXISTS idx_hostname ON log_entries(hostname);
             CREATE INDEX IF NOT EXISTS idx_severity ON log_entries(severity);
+            -- SQLite indexes end with the rowid, so this one also serves
+            -- "WHERE is_marker = 0 ORDER BY id DESC" without a sort step
             CREATE INDEX IF NOT EXISTS idx_is_marker ON log_entries(is_marker);
 
+            -- Sorting by received_at now uses id order instead
+            DROP INDEX IF EXISTS idx_received_at;
+
             CREATE TABLE IF NOT EXISTS known_hosts (
                 ip TEXT PRIMARY KEY,
                 hostname TEXT,
@@ -68,78 +148,175 @@ class LogDatabase:
             );
         """)
         conn.commit()
+        if self.search_index:
+            self._fts = self._init_fts(conn)
+        else:
+            self._drop_fts(conn)
+            self._fts = False
+
+    def _init_fts(self, conn: sqlite3.Connection) -> bool:
+        """
+        Set up the trigram full-text index that accelerates message search.
+
+        Trigram tokens keep the existing substring (LIKE '%...%') semantics,
+        which a word tokenizer such as unicode61 would not, but indexing
+        every three-character window makes each insert several times more
+        expensive and roughly doubles the database size. Hence opt-in.
+        Returns False when this SQLite build lacks FTS5 trigram support, in
+        which case search falls back to scanning log_entries.
+        """
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'log_fts'"
+        ).fetchone()
+        try:
+            conn.executescript("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS log_fts USING fts5(
+                    message, content='log_entries', content_rowid='id',
+                    tokenize='trigram'
+                );
+
+                CREATE TRIGGER IF NOT EXISTS log_fts_insert AFTER INSERT ON log_entries BEGIN
+                    INSERT INTO log_fts(rowid, message) VALUES (new.id, new.message);
+                END;
+
+                CREATE TRIGGER IF NOT EXISTS log_fts_delete AFTER DELETE ON log_entries BEGIN
+                    INSERT INTO log_fts(log_fts, rowid, message) VALUES ('delete', old.id, old.message);
+                END;
+            """)
+        except sqlite3.OperationalError:
+            return False
+        if not exists:
+            # Index any rows stored before the full-text table existed
+            logger.info("Building message search index; this can take a while "
+                        "on a large database")
+            conn.execute("INSERT INTO log_fts(log_fts) VALUES ('rebuild')")
+            conn.commit()
+            logger.info("Message search index built")
+        return True
+
+    def _drop_fts(self, conn: sqlite3.Connection):
+        """Remove the search index (and its insert cost) when it is disabled."""
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'log_fts'"
+        ).fetchone()
+        if not exists:
+            return
+        logger.info("Message search index disabled; removing it")
+        conn.executescript("""
+            DROP TRIGGER IF EXISTS log_fts_insert;
+            DROP TRIGGER IF EXISTS log_fts_delete;
+            DROP TABLE IF EXISTS log_fts;
+        """)
+        conn.commit()
+
+    def insert_log(self, entry: LogEntry) -> int:
+        return self.insert_logs_batch([entry])[0]
+
+    def insert_logs_batch(self, entries: list[LogEntry]) -> list[int]:
+        """
+        Insert many entries in a single transaction. Returns the new row ids.
 
-    def insert_log(self, entry: dict) -> int:
+        Each entry is updated with its id, received_at and, if it had none,
+        timestamp, so it matches the stored row.
+        """
+        if not entries:
+            return []
         conn = self._get_conn()
         now = datetime.utcnow().isoformat() + "Z"
-        cur = conn.execute("""
-            INSERT INTO log_entries
-                (timestamp, received_at, source_ip, source_port, hostname,
-                 facility, severity, priority, app_name, proc_id, msg_id,
-                 message, raw_message, is_syslog, is_marker, marker_style)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            entry.get("timestamp", now),
-            now,
-            entry.get("source_ip", "unknown"),
-            entry.get("source_port"),
-            (entry.get("hostname") or "").strip() or None,
-            entry.get("facility"),
-            entry.get("severity"),
-            entry.get("priority"),
-            entry.get("app_name"),
-            entry.get("proc_id"),
-            entry.get("msg_id"),
-            entry.get("message", ""),
-            entry.get("raw_message", ""),
-            1 if entry.get("is_syslog") else 0,
-            1 if entry.get("is_marker") else 0,
-            entry.get("marker_style"),
-        ))
-        conn.commit()
-        row_id = cur.lastrowid
-
-        # Update known_hosts
-        ip = entry.get("source_ip", "unknown")
-        hostname = (entry.get("hostname") or "").strip() or None
-        if ip != "marker" and ip != "unknown":
-            conn.execute("""
-                INSERT INTO known_hosts (ip, hostname, display_name, first_seen, last_seen, message_count)
-                VALUES (?, ?, ?, ?, ?, 1)
-                ON CONFLICT(ip) DO UPDATE SET
-                    hostname = COALESCE(excluded.hostname, known_hosts.hostname),
-                    last_seen = excluded.last_seen,
-                    message_count = known_hosts.message_count + 1
-            """, (ip, hostname, hostname, now, now))
+        rows = []
+        hosts = {}
+        for entry in entries:
+            # The parser already strips hostnames (None when absent), and
+            # sqlite3 stores the bool flags as 0/1 on its own
+            ip = entry.source_ip
+            hostname = entry.hostname
+            if not entry.timestamp:
+                entry.timestamp = now
+            entry.received_at = now
+            rows.append((
+                entry.timestamp, now, ip, entry.source_port, hostname,
+                entry.facility, entry.severity, entry.priority,
+                entry.app_name, entry.proc_id, entry.msg_id,
+                entry.message, entry.raw_message,
+                entry.is_syslog, entry.is_marker, entry.marker_style,
+            ))
+            if ip != "marker" and ip != "unknown":
+                prev_name, count = hosts.get(ip, (None, 0))
+                hosts[ip] = (hostname or prev_name, count + 1)
+
+        try:
+            # Take the write lock up front, so a concurrent marker insert
+            # waits on busy_timeout instead of failing mid-transaction
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(INSERT_SQL, rows)
+            # Ids are contiguous: the whole batch is written inside one transaction
+            last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
             conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
 
-        return row_id
+        self._cache_hosts(hosts, now)
+        ids = list(range(last_id - len(rows) + 1, last_id + 1))
+        for entry, row_id in zip(entries, ids):
+            entry.id = row_id
+        return ids
+
+    def _cache_hosts(self, hosts: dict, now: str):
+        """Fold per-batch host counts into the pending known_hosts updates."""
+        if not hosts:
+            return
+        with self._host_lock:
+            for ip, (name, count) in hosts.items():
+                cached = self._host_cache.get(ip)
+                if cached is None:
+                    self._host_cache[ip] = {
+                        "hostname": name, "first_seen": now,
+                        "last_seen": now, "count": count,
+                    }
+                else:
+                    if name:
+                        cached["hostname"] = name
+                    cached["last_seen"] = now
+                    cached["count"] += count
+
+    def flush_hosts(self):
+        """Write pending known_hosts updates as one upsert transaction."""
+        with self._host_lock:
+            if not self._host_cache:
+                return
+            conn = self._get_conn()
+            try:
+                conn.executemany("""
+                    INSERT INTO known_hosts (ip, hostname, display_name, first_seen, last_seen, message_count)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(ip) DO UPDATE SET
+                        hostname = COALESCE(excluded.hostname, known_hosts.hostname),
+                        last_seen = excluded.last_seen,
+                        message_count = known_hosts.message_count + excluded.message_count
+                """, [(ip, h["hostname"], h["hostname"], h["first_seen"], h["last_seen"], h["count"])
+                      for ip, h in self._host_cache.items()])
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            self._host_cache.clear()
 
     def insert_marker(self, label: str, timestamp: Optional[str] = None,
                       style: str = "default") -> int:
         now = datetime.utcnow().isoformat() + "Z"
-        entry = {
-            "timestamp": timestamp or now,
-            "source_ip": "marker",
-            "hostname": "MARKER",
-            "message": label,
-            "raw_message": f"[MARKER] {label}",
-            "is_marker": True,
-            "marker_style": style,
-        }
+        entry = LogEntry()
+        entry.timestamp = timestamp or now
+        entry.source_ip = "marker"
+        entry.hostname = "MARKER"
+        entry.message = label
+        entry.raw_message = f"[MARKER] {label}"
+        entry.is_marker = True
+        entry.marker_style = style
         return self.insert_log(entry)
 
-    def query_logs(self, limit: int = 200, offset: int = 0,
-                   source_ip: Optional[str] = None,
-                   hostname: Optional[str] = None,
-                   severity: Optional[int] = None,
-                   search: Optional[str] = None,
-                   start_time: Optional[str] = None,
-                   end_time: Optional[str] = None,
-                   sort_by: str = "received_at",
-                   sort_order: str = "DESC",
-                   include_markers: bool = True) -> list[dict]:
-        conn = self._get_conn()
+    def _build_where(self, source_ip, hostname, severity, search,
+                     start_time, end_time, include_markers):
         conditions = []
         params = []
 
@@ -154,7 +331,10 @@ class LogDatabase:
             conditions.append("severity <= ?")
             params.append(severity)
         if search:
-            conditions.append("message LIKE ?")
+            if self._fts and _has_trigram(search):
+                conditions.append("id IN (SELECT rowid FROM log_fts WHERE message LIKE ?)")
+            else:
+                conditions.append("message LIKE ?")
             params.append(f"%{search}%")
         if start_time:
             conditions.append("timestamp >= ?")
@@ -165,27 +345,88 @@ class LogDatabase:
         if not include_markers:
             conditions.append("is_marker = 0")
 
+        where = ""
+        if conditions:
+            where = "WHERE " + " AND ".join(conditions)
+        return where, params
+
+    @staticmethod
+    def _build_order(sort_by, sort_order):
         allowed_sort = {"received_at", "timestamp", "severity", "source_ip", "hostname"}
         if sort_by not in allowed_sort:
             sort_by = "received_at"
         if sort_order.upper() not in ("ASC", "DESC"):
             sort_order = "DESC"
+        if sort_by == "received_at":
+            # received_at is stamped at insert time, so it follows id order;
+            # sorting on the primary key avoids a separate sort pass
+            return f"ORDER BY id {sort_order}"
+        # The remaining columns repeat across rows (device timestamps can
+        # repeat and are NULL for raw messages), so id breaks ties to keep
+        # OFFSET paging stable
+        return f"ORDER BY {sort_by} {sort_order}, id {sort_order}"
 
-        where = ""
-        if conditions:
-            where = "WHERE " + " AND ".join(conditions)
+    def query_logs(self, limit: int = 200, offset: int = 0,
+                   source_ip: Optional[str] = None,
+                   hostname: Optional[str] = None,
+                   severity: Optional[int] = None,
+                   search: Optional[str] = None,
+                   start_time: Optional[str] = None,
+                   end_time: Optional[str] = None,
+                   sort_by: str = "received_at",
+                   sort_order: str = "DESC",
+                   include_markers: bool = True) -> list[dict]:
+        where, params = self._build_where(
+            source_ip, hostname, severity, search,
+            start_time, end_time, include_markers)
 
         query = f"""
             SELECT * FROM log_entries
             {where}
-            ORDER BY {sort_by} {sort_order}, id {sort_order}
+            {self._build_order(sort_by, sort_order)}
             LIMIT ? OFFSET ?
         """
         params.extend([limit, offset])
 
-        rows = conn.execute(query, params).fetchall()
+        with self.read_conn() as conn:
+            rows = conn.execute(query, params).fetchall()
         return [dict(r) for r in rows]
 
+    def iter_logs(self, columns: tuple[str, ...], limit: int = 10000,
+                  source_ip: Optional[str] = None,
+                  hostname: Optional[str] = None,
+                  severity: Optional[int] = None,
+                  search: Optional[str] = None,
+                  start_time: Optional[str] = None,
+                  end_time: Optional[str] = None,
+                  sort_by: str = "received_at",
+                  sort_order: str = "DESC",
+                  include_markers: bool = True):
+        """
+        Yield matching rows as plain tuples of the requested columns,
+        straight from the cursor without building the full result list.
+        """
+        where, params = self._build_where(
+            source_ip, hostname, severity, search,
+            start_time, end_time, include_markers)
+
+        query = f"""
+            SELECT {", ".join(columns)} FROM log_entries
+            {where}
+            {self._build_order(sort_by, sort_order)}
+            LIMIT ?
+        """
+        params.append(limit)
+
+        # A dedicated connection rather than a pool slot: a slow download
+        # holds it for as long as the client keeps the response open
+        conn = self._open_read_conn()
+        conn.row_factory = None
+        try:
+            yield from conn.execute(query, params)
+        finally:
+            conn.close()
+
     def count_logs(self, source_ip: Optional[str] = None,
                    hostname: Optional[str] = None,
                    severity: Optional[int] = None,
@@ -193,44 +434,19 @@ class LogDatabase:
                    start_time: Optional[str] = None,
                    end_time: Optional[str] = None,
                    include_markers: bool = True) -> int:
-        conn = self._get_conn()
-        conditions = []
-        params = []
-
-        if source_ip:
-            conditions.append("source_ip = ?")
-            params.append(source_ip)
-        if hostname:
-            conditions.append("(hostname LIKE ? OR source_ip IN "
-                              "(SELECT ip FROM known_hosts WHERE display_name LIKE ?))")
-            params.extend([f"%{hostname}%", f"%{hostname}%"])
-        if severity is not None:
-            conditions.append("severity <= ?")
-            params.append(severity)
-        if search:
-            conditions.append("message LIKE ?")
-            params.append(f"%{search}%")
-        if start_time:
-            conditions.append("timestamp >= ?")
-            params.append(start_time)
-        if end_time:
-            conditions.append("timestamp <= ?")
-            params.append(end_time)
-        if not include_markers:
-            conditions.append("is_marker = 0")
-
-        where = ""
-        if conditions:
-            where = "WHERE " + " AND ".join(conditions)
+        where, params = self._build_where(
+            source_ip, hostname, severity, search,
+            start_time, end_time, include_markers)
 
-        row = conn.execute(f"SELECT COUNT(*) as cnt FROM log_entries {where}", params).fetchone()
+        with self.read_conn() as conn:
+            row = conn.execute(f"SELECT COUNT(*) as cnt FROM log_entries {where}", params).fetchone()
         return row["cnt"]
 
     def get_known_hosts(self) -> list[dict]:
-        conn = self._get_conn()
-        rows = conn.execute(
-            "SELECT * FROM known_hosts ORDER BY last_seen DESC"
-        ).fetchall()
+        with self.read_conn() as conn:
+            rows = conn.execute(
+                "SELECT * FROM known_hosts ORDER BY last_seen DESC"
+            ).fetchall()
         return [dict(r) for r in rows]
 
     def update_host_display_name(self, ip: str, display_name: str):
@@ -242,14 +458,14 @@ class LogDatabase:
         conn.commit()
 
     def get_latest_id(self) -> int:
-        conn = self._get_conn()
-        row = conn.execute("SELECT MAX(id) as max_id FROM log_entries").fetchone()
+        with self.read_conn() as conn:
+            row = conn.execute("SELECT MAX(id) as max_id FROM log_entries").fetchone()
         return row["max_id"] or 0
 
     def get_entries_after(self, after_id: int, limit: int = 100) -> list[dict]:
-        conn = self._get_conn()
-        rows = conn.execute(
-            "SELECT * FROM log_entries WHERE id > ? ORDER BY id ASC LIMIT ?",
-            (after_id, limit)
-        ).fetchall()
+        with self.read_conn() as conn:
+            rows = conn.execute(
+                "SELECT * FROM log_entries WHERE id > ? ORDER BY id ASC LIMIT ?",
+                (after_id, limit)
+            ).fetchall()
         return [dict(r) for r in rows]
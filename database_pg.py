@@ -6,16 +6,23 @@ with the 'fetchlog' schema.
 """
 
 import json
+import queue
 import threading
+from contextlib import contextmanager
 from datetime import datetime
 from typing import Optional
 
 import psycopg2
 import psycopg2.extras
 
+from syslog_parser import LogEntry
+
 
 DEFAULT_CONFIG_PATH = "db_config.json"
 
+READ_POOL_SIZE = 4
+READ_POOL_TIMEOUT = 30  # seconds to wait for a free read connection
+
 
 def load_pg_config(config: dict) -> dict:
     """Extract PostgreSQL connection settings from a config dict."""
@@ -34,21 +41,51 @@ class LogDatabase:
         self.pg_config = load_pg_config(config)
         self.schema = self.pg_config["schema"]
         self._local = threading.local()
+        # known_hosts changes accumulated in memory until flush_hosts()
+        self._host_cache: dict[str, dict] = {}
+        self._host_lock = threading.Lock()
         self._init_db()
+        self._read_pool: queue.Queue = queue.Queue(maxsize=READ_POOL_SIZE)
+        for _ in range(READ_POOL_SIZE):
+            self._read_pool.put(self._open_read_conn())
+
+    def _connect(self):
+        conn = psycopg2.connect(
+            host=self.pg_config["host"],
+            port=self.pg_config["port"],
+            dbname=self.pg_config["dbname"],
+            user=self.pg_config["user"],
+            password=self.pg_config["password"],
+        )
+        conn.autocommit = False
+        return conn
 
     def _get_conn(self):
+        """Per-thread read/write connection, used for inserts and updates."""
         if not hasattr(self._local, "conn") or self._local.conn is None or self._local.conn.closed:
-            conn = psycopg2.connect(
-                host=self.pg_config["host"],
-                port=self.pg_config["port"],
-                dbname=self.pg_config["dbname"],
-                user=self.pg_config["user"],
-                password=self.pg_config["password"],
-            )
-            conn.autocommit = False
-            self._local.conn = conn
+            self._local.conn = self._connect()
         return self._local.conn
 
+    def _open_read_conn(self):
+        conn = self._connect()
+        # Plain SELECTs must not leave the connection idle in a transaction
+        conn.autocommit = True
+        return conn
+
+    @contextmanager
+    def read_conn(self):
+        """Check out a read connection from the pool."""
+        try:
+            conn = self._read_pool.get(timeout=READ_POOL_TIMEOUT)
+        except queue.Empty:
+            raise TimeoutError("no free database read connection") from None
+        try:
+            if conn.closed:
+                conn = self._open_read_conn()
+            yield conn
+        finally:
+            self._read_pool.put(conn)
+
     def _init_db(self):
         conn = self._get_conn()
         cur = conn.cursor()
@@ -79,13 +116,16 @@ class LogDatabase:
         # Create indexes
         for idx_name, col in [
             ("idx_timestamp", "timestamp"),
-            ("idx_received_at", "received_at"),
             ("idx_source_ip", "source_ip"),
             ("idx_hostname", "hostname"),
             ("idx_severity", "severity"),
-            ("idx_is_marker", "is_marker"),
+            ("idx_id_marker", "is_marker, id DESC"),
         ]:
             cur.execute(f"CREATE INDEX IF NOT EXISTS {idx_name} ON {s}.log_entries({col})")
+        # Sorting by received_at now uses id order instead, and idx_id_marker
+        # also covers lookups on is_marker alone
+        cur.execute(f"DROP INDEX IF EXISTS {s}.idx_received_at")
+        cur.execute(f"DROP INDEX IF EXISTS {s}.idx_is_marker")
 
         cur.execute(f"""
             CREATE TABLE IF NOT EXISTS {s}.known_hosts (
@@ -109,70 +149,127 @@ class LogDatabase:
             return value.replace("\x00", "")
         return value
 
-    def insert_log(self, entry: dict) -> int:
+    def insert_log(self, entry: LogEntry) -> int:
+        return self.insert_logs_batch([entry])[0]
+
+    def insert_logs_batch(self, entries: list[LogEntry]) -> list[int]:
+        """
+        Insert many entries in a single transaction. Returns the new row ids.
+
+        Each entry is updated with its id, received_at and, if it had none,
+        timestamp, so it matches the stored row.
+        """
+        if not entries:
+            return []
         conn = self._get_conn()
         cur = conn.cursor()
         self._set_search_path(cur)
         now = datetime.utcnow().isoformat() + "Z"
         _c = self._clean
-        cur.execute(f"""
-            INSERT INTO {self.schema}.log_entries
-                (timestamp, received_at, source_ip, source_port, hostname,
-                 facility, severity, priority, app_name, proc_id, msg_id,
-                 message, raw_message, is_syslog, is_marker, marker_style)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            RETURNING id
-        """, (
-            _c(entry.get("timestamp", now)),
-            now,
-            _c(entry.get("source_ip", "unknown")),
-            entry.get("source_port"),
-            _c((entry.get("hostname") or "").strip()) or None,
-            entry.get("facility"),
-            entry.get("severity"),
-            entry.get("priority"),
-            _c(entry.get("app_name")),
-            _c(entry.get("proc_id")),
-            _c(entry.get("msg_id")),
-            _c(entry.get("message", "")),
-            _c(entry.get("raw_message", "")),
-            1 if entry.get("is_syslog") else 0,
-            1 if entry.get("is_marker") else 0,
-            _c(entry.get("marker_style")),
-        ))
-        row_id = cur.fetchone()[0]
-        conn.commit()
+        rows = []
+        hosts = {}
+        for entry in entries:
+            ip = entry.source_ip
+            hostname = _c((entry.hostname or "").strip()) or None
+            if not entry.timestamp:
+                entry.timestamp = now
+            entry.received_at = now
+            rows.append((
+                _c(entry.timestamp),
+                now,
+                _c(ip),
+                entry.source_port,
+                hostname,
+                entry.facility,
+                entry.severity,
+                entry.priority,
+                _c(entry.app_name),
+                _c(entry.proc_id),
+                _c(entry.msg_id),
+                _c(entry.message),
+                _c(entry.raw_message),
+                1 if entry.is_syslog else 0,
+                1 if entry.is_marker else 0,
+                _c(entry.marker_style),
+            ))
+            if ip != "marker" and ip != "unknown":
+                prev_name, count = hosts.get(ip, (None, 0))
+                hosts[ip] = (hostname or prev_name, count + 1)
+
+        try:
+            ids = psycopg2.extras.execute_values(cur, f"""
+                INSERT INTO {self.schema}.log_entries
+                    (timestamp, received_at, source_ip, source_port, hostname,
+                     facility, severity, priority, app_name, proc_id, msg_id,
+                     message, raw_message, is_syslog, is_marker, marker_style)
+                VALUES %s
+                RETURNING id
+            """, rows, page_size=len(rows), fetch=True)
 
-        # Update known_hosts
-        ip = entry.get("source_ip", "unknown")
-        hostname = (entry.get("hostname") or "").strip() or None
-        if ip != "marker" and ip != "unknown":
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        self._cache_hosts(hosts, now)
+        ids = [row[0] for row in ids]
+        for entry, row_id in zip(entries, ids):
+            entry.id = row_id
+        return ids
+
+    def _cache_hosts(self, hosts: dict, now: str):
+        """Fold per-batch host counts into the pending known_hosts updates."""
+        if not hosts:
+            return
+        with self._host_lock:
+            for ip, (name, count) in hosts.items():
+                cached = self._host_cache.get(ip)
+                if cached is None:
+                    self._host_cache[ip] = {
+                        "hostname": name, "first_seen": now,
+                        "last_seen": now, "count": count,
+                    }
+                else:
+                    if name:
+                        cached["hostname"] = name
+                    cached["last_seen"] = now
+                    cached["count"] += count
+
+    def flush_hosts(self):
+        """Write pending known_hosts updates as one upsert transaction."""
+        with self._host_lock:
+            if not self._host_cache:
+                return
+            conn = self._get_conn()
             cur = conn.cursor()
             self._set_search_path(cur)
-            cur.execute(f"""
-                INSERT INTO {self.schema}.known_hosts (ip, hostname, display_name, first_seen, last_seen, message_count)
-                VALUES (%s, %s, %s, %s, %s, 1)
-                ON CONFLICT(ip) DO UPDATE SET
-                    hostname = COALESCE(EXCLUDED.hostname, {self.schema}.known_hosts.hostname),
-                    last_seen = EXCLUDED.last_seen,
-                    message_count = {self.schema}.known_hosts.message_count + 1
-            """, (ip, hostname, hostname, now, now))
-            conn.commit()
-
-        return row_id
+            try:
+                psycopg2.extras.execute_values(cur, f"""
+                    INSERT INTO {self.schema}.known_hosts (ip, hostname, display_name, first_seen, last_seen, message_count)
+                    VALUES %s
+                    ON CONFLICT(ip) DO UPDATE SET
+                        hostname = COALESCE(EXCLUDED.hostname, {self.schema}.known_hosts.hostname),
+                        last_seen = EXCLUDED.last_seen,
+                        message_count = {self.schema}.known_hosts.message_count + EXCLUDED.message_count
+                """, [(ip, h["hostname"], h["hostname"], h["first_seen"], h["last_seen"], h["count"])
+                      for ip, h in self._host_cache.items()])
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            self._host_cache.clear()
 
     def insert_marker(self, label: str, timestamp: Optional[str] = None,
                       style: str = "default") -> int:
         now = datetime.utcnow().isoformat() + "Z"
-        entry = {
-            "timestamp": timestamp or now,
-            "source_ip": "marker",
-            "hostname": "MARKER",
-            "message": label,
-            "raw_message": f"[MARKER] {label}",
-            "is_marker": True,
-            "marker_style": style,
-        }
+        entry = LogEntry()
+        entry.timestamp = timestamp or now
+        entry.source_ip = "marker"
+        entry.hostname = "MARKER"
+        entry.message = label
+        entry.raw_message = f"[MARKER] {label}"
+        entry.is_marker = True
+        entry.marker_style = style
         return self.insert_log(entry)
 
     def _build_where(self, source_ip, hostname, severity, search,
@@ -207,6 +304,22 @@ class LogDatabase:
             where = "WHERE " + " AND ".join(conditions)
         return where, params
 
+    @staticmethod
+    def _build_order(sort_by, sort_order):
+        allowed_sort = {"received_at", "timestamp", "severity", "source_ip", "hostname"}
+        if sort_by not in allowed_sort:
+            sort_by = "received_at"
+        if sort_order.upper() not in ("ASC", "DESC"):
+            sort_order = "DESC"
+        if sort_by == "received_at":
+            # received_at is stamped at insert time, so it follows id order;
+            # sorting on the primary key avoids a separate sort pass
+            return f"ORDER BY id {sort_order}"
+        # The remaining columns repeat across rows (device timestamps can
+        # repeat and are NULL for raw messages), so id breaks ties to keep
+        # OFFSET paging stable
+        return f"ORDER BY {sort_by} {sort_order}, id {sort_order}"
+
     def query_logs(self, limit: int = 200, offset: int = 0,
                    source_ip: Optional[str] = None,
                    hostname: Optional[str] = None,
@@ -217,30 +330,60 @@ class LogDatabase:
                    sort_by: str = "received_at",
                    sort_order: str = "DESC",
                    include_markers: bool = True) -> list[dict]:
-        conn = self._get_conn()
-        cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-        self._set_search_path(cur)
-
         where, params = self._build_where(
             source_ip, hostname, severity, search,
             start_time, end_time, include_markers)
 
-        allowed_sort = {"received_at", "timestamp", "severity", "source_ip", "hostname"}
-        if sort_by not in allowed_sort:
-            sort_by = "received_at"
-        if sort_order.upper() not in ("ASC", "DESC"):
-            sort_order = "DESC"
-
         query = f"""
             SELECT * FROM {self.schema}.log_entries
             {where}
-            ORDER BY {sort_by} {sort_order}, id {sort_order}
+            {self._build_order(sort_by, sort_order)}
             LIMIT %s OFFSET %s
         """
         params.extend([limit, offset])
 
-        cur.execute(query, params)
-        return [dict(r) for r in cur.fetchall()]
+        with self.read_conn() as conn:
+            cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+            self._set_search_path(cur)
+            cur.execute(query, params)
+            return [dict(r) for r in cur.fetchall()]
+
+    def iter_logs(self, columns: tuple[str, ...], limit: int = 10000,
+                  source_ip: Optional[str] = None,
+                  hostname: Optional[str] = None,
+                  severity: Optional[int] = None,
+                  search: Optional[str] = None,
+                  start_time: Optional[str] = None,
+                  end_time: Optional[str] = None,
+                  sort_by: str = "received_at",
+                  sort_order: str = "DESC",
+                  include_markers: bool = True):
+        """
+        Yield matching rows as plain tuples of the requested columns,
+        fetched in chunks through a server-side cursor.
+        """
+        where, params = self._build_where(
+            source_ip, hostname, severity, search,
+            start_time, end_time, include_markers)
+
+        query = f"""
+            SELECT {", ".join(columns)} FROM {self.schema}.log_entries
+            {where}
+            {self._build_order(sort_by, sort_order)}
+            LIMIT %s
+        """
+        params.append(limit)
+
+        # A dedicated connection: the generator may be resumed from different
+        # threads, and the server-side cursor must outlive other queries
+        conn = self._connect()
+        try:
+            cur = conn.cursor(name="iter_logs")
+            cur.itersize = 2000
+            cur.execute(query, params)
+            yield from cur
+        finally:
+            conn.close()
 
     def count_logs(self, source_ip: Optional[str] = None,
                    hostname: Optional[str] = None,
@@ -249,23 +392,22 @@ class LogDatabase:
                    start_time: Optional[str] = None,
                    end_time: Optional[str] = None,
                    include_markers: bool = True) -> int:
-        conn = self._get_conn()
-        cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-        self._set_search_path(cur)
-
         where, params = self._build_where(
             source_ip, hostname, severity, search,
             start_time, end_time, include_markers)
 
-        cur.execute(f"SELECT COUNT(*) as cnt FROM {self.schema}.log_entries {where}", params)
-        return cur.fetchone()["cnt"]
+        with self.read_conn() as conn:
+            cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+            self._set_search_path(cur)
+            cur.execute(f"SELECT COUNT(*) as cnt FROM {self.schema}.log_entries {where}", params)
+            return cur.fetchone()["cnt"]
 
     def get_known_hosts(self) -> list[dict]:
-        conn = self._get_conn()
-        cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-        self._set_search_path(cur)
-        cur.execute(f"SELECT * FROM {self.schema}.known_hosts ORDER BY last_seen DESC")
-        return [dict(r) for r in cur.fetchall()]
+        with self.read_conn() as conn:
+            cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+            self._set_search_path(cur)
+            cur.execute(f"SELECT * FROM {self.schema}.known_hosts ORDER BY last_seen DESC")
+            return [dict(r) for r in cur.fetchall()]
 
     def update_host_display_name(self, ip: str, display_name: str):
         conn = self._get_conn()
@@ -278,19 +420,19 @@ class LogDatabase:
         conn.commit()
 
     def get_latest_id(self) -> int:
-        conn = self._get_conn()
-        cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-        self._set_search_path(cur)
-        cur.execute(f"SELECT MAX(id) as max_id FROM {self.schema}.log_entries")
-        row = cur.fetchone()
-        return row["max_id"] or 0
+        with self.read_conn() as conn:
+            cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+            self._set_search_path(cur)
+            cur.execute(f"SELECT MAX(id) as max_id FROM {self.schema}.log_entries")
+            row = cur.fetchone()
+            return row["max_id"] or 0
 
     def get_entries_after(self, after_id: int, limit: int = 100) -> list[dict]:
-        conn = self._get_conn()
-        cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-        self._set_search_path(cur)
-        cur.execute(
-            f"SELECT * FROM {self.schema}.log_entries WHERE id > %s ORDER BY id ASC LIMIT %s",
-            (after_id, limit)
-        )
-        return [dict(r) for r in cur.fetchall()]
+        with self.read_conn() as conn:
+            cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+            self._set_search_path(cur)
+            cur.execute(
+                f"SELECT * FROM {self.schema}.log_entries WHERE id > %s ORDER BY id ASC LIMIT %s",
+                (after_id, limit)
+            )
+            return [dict(r) for r in cur.fetchall()]
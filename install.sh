@@ -115,7 +115,7 @@ cmd_install() {
         || die "Virtual environment not found at ${VENV_DIR}. Run 'sudo $0 setup' first."
 
     info "Verifying installed packages in ${VENV_DIR}..."
-    "${VENV_DIR}/bin/python3" -c "import fastapi, uvicorn, websockets, jinja2, aiofiles, dateutil" \
+    "${VENV_DIR}/bin/python3" -c "import fastapi, uvicorn, websockets, jinja2, aiofiles, dateutil, orjson" \
         2>/dev/null \
         || die "Required packages are missing. Run 'sudo $0 setup' first."
     success "All packages present."
@@ -2,6 +2,7 @@
 
 const App = {
     ws: null,
+    wsDecoder: new TextDecoder(),
     autoScroll: true,
     liveMode: true,
     currentPage: 0,
@@ -90,6 +91,8 @@ const App = {
     connectWebSocket() {
         const proto = location.protocol === 'https:' ? 'wss' : 'ws';
         this.ws = new WebSocket(`${proto}://${location.host}/ws`);
+        // Log entries arrive as binary frames of UTF-8 JSON
+        this.ws.binaryType = 'arraybuffer';
 
         this.ws.onopen = () => {
             const wasReconnect = this.reconnectAttempts > 0;
@@ -102,7 +105,9 @@ const App = {
         this.ws.onmessage = (event) => {
             if (event.data === 'pong') return;
             try {
-                const entry = JSON.parse(event.data);
+                const text = typeof event.data === 'string'
+                    ? event.data : this.wsDecoder.decode(event.data);
+                const entry = JSON.parse(text);
 
                 if (entry.id && entry.id > this.lastSeenId) this.lastSeenId = entry.id;
                 this.totalEntries++;
@@ -5,8 +5,9 @@ Also handles raw/plain-text messages from non-syslog sources.
 """
 
 import re
+from collections import deque
 from datetime import datetime
-from typing import Optional
+from typing import Optional, Union
 
 # Syslog facility names
 FACILITIES = {
@@ -24,6 +25,16 @@ SEVERITIES = {
     4: "Warning", 5: "Notice", 6: "Informational", 7: "Debug",
 }
 
+# Names indexed by code, for the per-entry lookups on the ingest path
+FACILITY_NAMES = tuple(FACILITIES[i] for i in range(24))
+SEVERITY_NAMES = tuple(SEVERITIES[i] for i in range(8))
+
+# RFC 3164 month abbreviations (always English, whatever the locale)
+_MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+
 # RFC 3164 pattern: <PRI>TIMESTAMP HOSTNAME APP[PID]: MSG
 RFC3164_PATTERN = re.compile(
     r'^<(\d{1,3})>'
@@ -33,6 +44,8 @@ RFC3164_PATTERN = re.compile(
 )
 
 # RFC 5424 pattern: <PRI>VERSION TIMESTAMP HOSTNAME APP PROCID MSGID STRUCTURED MSG
+# The structured-data element stops at the first ']' so a failed match can't
+# backtrack through every later ']' in the packet (quadratic on large input)
 RFC5424_PATTERN = re.compile(
     r'^<(\d{1,3})>(\d+)\s+'
     r'(\S+)\s+'
@@ -40,13 +53,98 @@ RFC5424_PATTERN = re.compile(
     r'(\S+)\s+'
     r'(\S+)\s+'
     r'(\S+)\s+'
-    r'(?:\[.*?\]|-)\s*'
+    r'(?:\[[^\]\n]*\]|-)\s*'
     r'(.*)$'
 )
 
 # Simple priority-only: <PRI>message
 SIMPLE_PRI_PATTERN = re.compile(r'^<(\d{1,3})>(.*)$')
 
+# RFC 3164 MSG part: APP[PID]: message
+APP_PID_PATTERN = re.compile(r'^(\S+?)(?:\[(\d+)\])?:\s*(.*)', re.DOTALL)
+
+
+class LogEntry:
+    """
+    A parsed log message.
+
+    Uses __slots__ and a free-list so the ingest path reuses instances
+    instead of allocating a fresh dict for every datagram. Call
+    LogEntry.acquire() to get one and LogEntry.release() once the entry
+    has been written to the database.
+    """
+
+    __slots__ = (
+        "source_ip", "source_port", "raw_message", "timestamp", "is_syslog",
+        "priority", "facility", "severity", "hostname", "app_name", "proc_id",
+        "msg_id", "message", "is_marker", "marker_style", "id",
+        "received_at", "severity_name", "facility_name",
+    )
+
+    # deque.append/pop are atomic, so the pool is safe to share between the
+    # UDP thread (acquire) and the database writer thread (release)
+    _pool: deque = deque(maxlen=4096)
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.source_ip = "unknown"
+        self.source_port = None
+        self.raw_message = ""
+        self.timestamp = None
+        self.is_syslog = False
+        self.priority = None
+        self.facility = None
+        self.severity = None
+        self.hostname = None
+        self.app_name = None
+        self.proc_id = None
+        self.msg_id = None
+        self.message = ""
+        self.is_marker = False
+        self.marker_style = None
+        self.id = None
+        self.received_at = None
+        self.severity_name = None
+        self.facility_name = None
+
+    def to_dict(self) -> dict:
+        """Return the entry in the same shape as an enriched /api/logs row."""
+        return {
+            "id": self.id,
+            "timestamp": self.timestamp,
+            "received_at": self.received_at,
+            "source_ip": self.source_ip,
+            "source_port": self.source_port,
+            "hostname": self.hostname,
+            "facility": self.facility,
+            "severity": self.severity,
+            "priority": self.priority,
+            "app_name": self.app_name,
+            "proc_id": self.proc_id,
+            "msg_id": self.msg_id,
+            "message": self.message,
+            "raw_message": self.raw_message,
+            "is_syslog": 1 if self.is_syslog else 0,
+            "is_marker": 1 if self.is_marker else 0,
+            "marker_style": self.marker_style,
+            "severity_name": self.severity_name,
+            "facility_name": self.facility_name,
+        }
+
+    @classmethod
+    def acquire(cls) -> "LogEntry":
+        try:
+            return cls._pool.pop()
+        except IndexError:
+            return cls()
+
+    @classmethod
+    def release(cls, entry: "LogEntry"):
+        entry.reset()
+        cls._pool.append(entry)
+
 
 def decode_priority(pri: int) -> tuple[int, int]:
     """Decode PRI value into facility and severity."""
@@ -56,138 +154,131 @@ def decode_priority(pri: int) -> tuple[int, int]:
 
 
 def facility_name(code: int) -> str:
-    return FACILITIES.get(code, f"unknown({code})")
+    return FACILITY_NAMES[code] if 0 <= code < 24 else f"unknown({code})"
 
 
 def severity_name(code: int) -> str:
-    return SEVERITIES.get(code, f"unknown({code})")
+    return SEVERITY_NAMES[code] if 0 <= code < 8 else f"unknown({code})"
+
+
+def _set_priority(entry: LogEntry, pri: int):
+    """Fill in PRI-derived fields, including the display names."""
+    entry.priority = pri
+    entry.facility, entry.severity = decode_priority(pri)
+    entry.facility_name = facility_name(entry.facility)
+    entry.severity_name = severity_name(entry.severity)
 
 
 def parse_rfc3164_timestamp(ts_str: str) -> Optional[str]:
     """Parse RFC 3164 timestamp (e.g., 'Jan  5 14:30:00') into ISO format."""
+    # Split by hand: datetime.strptime took well over half of the total
+    # parse time for an RFC 3164 message
     try:
+        month, day, clock = ts_str.split()
+        hour, minute, second = clock.split(":")
         now = datetime.utcnow()
-        parsed = datetime.strptime(ts_str, "%b %d %H:%M:%S")
-        parsed = parsed.replace(year=now.year)
+        parsed = datetime(now.year, _MONTHS[month.lower()], int(day),
+                          int(hour), int(minute), int(second))
         # If the parsed date is in the future by more than a day, assume previous year
         if parsed > now and (parsed - now).days > 1:
             parsed = parsed.replace(year=now.year - 1)
         return parsed.isoformat() + "Z"
-    except ValueError:
+    except (KeyError, ValueError):
         return None
 
 
-def parse_message(data: bytes, source_ip: str, source_port: int) -> dict:
+def parse_message(data: Union[bytes, bytearray, memoryview],
+                  source_ip: str, source_port: int) -> LogEntry:
     """
     Parse an incoming UDP message. Tries syslog formats first,
     falls back to treating it as a raw string.
+
+    data may be any bytes-like object, such as a slice of a reused receive
+    buffer; it is not referenced after this returns.
+
+    The entry's timestamp is left as None when the message doesn't carry
+    a usable one; the database fills in the batch's receive time.
     """
-    now = datetime.utcnow().isoformat() + "Z"
+    # For packet-sized buffers, copying to bytes and decoding is faster
+    # than decoding the buffer in place with str(data, "utf-8")
+    if type(data) is not bytes:
+        data = bytes(data)
 
-    # Try to decode as UTF-8, fall back to latin-1
+    # Try to decode as UTF-8, fall back to latin-1. decode() with no
+    # argument takes the UTF-8 fast path without a codec name lookup.
     try:
-        text = data.decode("utf-8").strip()
+        text = data.decode().strip()
     except UnicodeDecodeError:
         text = data.decode("latin-1").strip()
 
     if not text:
         text = "(empty message)"
 
-    result = {
-        "source_ip": source_ip,
-        "source_port": source_port,
-        "raw_message": text,
-        "timestamp": now,
-        "is_syslog": False,
-    }
+    entry = LogEntry.acquire()
+    entry.source_ip = source_ip
+    entry.source_port = source_port
+    entry.raw_message = text
 
-    # Try RFC 5424 first (more specific)
-    match = RFC5424_PATTERN.match(text)
+    # Every syslog format starts with <PRI>; anything else is raw text and
+    # skips the regexes entirely
+    gt = text.find(">", 1, 5) if text[0] == "<" else -1
+    if gt == -1:
+        entry.message = text
+        return entry
+
+    # Try RFC 5424 first (more specific); its VERSION field is numeric
+    match = RFC5424_PATTERN.match(text) if text[gt + 1:gt + 2].isdigit() else None
     if match:
         pri = int(match.group(1))
-        facility, severity = decode_priority(pri)
         ts_str = match.group(3)
-        hostname = (match.group(4).strip() or None) if match.group(4) != "-" else None
-        app_name = match.group(5) if match.group(5) != "-" else None
-        proc_id = match.group(6) if match.group(6) != "-" else None
-        msg_id = match.group(7) if match.group(7) != "-" else None
-        message = match.group(8)
-
-        # Parse ISO timestamp
-        timestamp = now
+        hostname = match.group(4)
+        app_name = match.group(5)
+        proc_id = match.group(6)
+        msg_id = match.group(7)
+
+        entry.is_syslog = True
+        _set_priority(entry, pri)
         if ts_str and ts_str != "-":
-            try:
-                # Handle various ISO formats
-                ts_str_clean = ts_str.replace("Z", "+00:00")
-                timestamp = ts_str_clean
-            except Exception:
-                pass
-
-        result.update({
-            "is_syslog": True,
-            "priority": pri,
-            "facility": facility,
-            "severity": severity,
-            "timestamp": timestamp,
-            "hostname": hostname,
-            "app_name": app_name,
-            "proc_id": proc_id,
-            "msg_id": msg_id,
-            "message": message,
-        })
-        return result
+            # Handle various ISO formats
+            entry.timestamp = ts_str.replace("Z", "+00:00")
+        entry.hostname = (hostname.strip() or None) if hostname != "-" else None
+        entry.app_name = app_name if app_name != "-" else None
+        entry.proc_id = proc_id if proc_id != "-" else None
+        entry.msg_id = msg_id if msg_id != "-" else None
+        entry.message = match.group(8)
+        return entry
 
     # Try RFC 3164
     match = RFC3164_PATTERN.match(text)
     if match:
         pri = int(match.group(1))
-        facility, severity = decode_priority(pri)
-        ts_str = match.group(2)
-        hostname = match.group(3).strip()
         remaining = match.group(4)
 
-        timestamp = parse_rfc3164_timestamp(ts_str) or now
+        entry.is_syslog = True
+        _set_priority(entry, pri)
+        entry.timestamp = parse_rfc3164_timestamp(match.group(2))
+        entry.hostname = match.group(3).strip()
 
         # Try to extract app_name[pid]: message
-        app_match = re.match(r'^(\S+?)(?:\[(\d+)\])?:\s*(.*)', remaining, re.DOTALL)
+        app_match = APP_PID_PATTERN.match(remaining)
         if app_match:
-            app_name = app_match.group(1)
-            proc_id = app_match.group(2)
-            message = app_match.group(3)
+            entry.app_name = app_match.group(1)
+            entry.proc_id = app_match.group(2)
+            entry.message = app_match.group(3)
         else:
-            app_name = None
-            proc_id = None
-            message = remaining
-
-        result.update({
-            "is_syslog": True,
-            "priority": pri,
-            "facility": facility,
-            "severity": severity,
-            "timestamp": timestamp,
-            "hostname": hostname,
-            "app_name": app_name,
-            "proc_id": proc_id,
-            "message": message,
-        })
-        return result
+            entry.message = remaining
+        return entry
 
     # Try simple <PRI>message
     match = SIMPLE_PRI_PATTERN.match(text)
     if match:
         pri = int(match.group(1))
         if 0 <= pri <= 191:  # Valid syslog priority range
-            facility, severity = decode_priority(pri)
-            message = match.group(2).strip()
-            result.update({
-                "is_syslog": True,
-                "priority": pri,
-                "facility": facility,
-                "severity": severity,
-                "message": message or "(empty)",
-            })
-            return result
+            entry.is_syslog = True
+            _set_priority(entry, pri)
+            entry.message = match.group(2).strip() or "(empty)"
+            return entry
 
     # Raw / plain text message - not syslog
-    result["message"] = text
-    return result
+    entry.message = text
+    return entry
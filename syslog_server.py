@@ -1,71 +1,147 @@
 """
-Async UDP syslog server.
+UDP syslog server.
 
 Listens on a configurable UDP port and receives syslog messages
-as well as raw strings from any device.
+as well as raw strings from any device. Packets are received on dedicated
+threads so intake never waits on the web server's event loop.
 """
 
-import asyncio
 import logging
-from typing import Callable, Optional
+import socket
+import sys
+import threading
+from typing import Callable
 
-from syslog_parser import parse_message
+from syslog_parser import LogEntry, parse_message
 
 logger = logging.getLogger("fetchlog.udp")
 
+# Kernel receive buffer requested for the UDP socket. Large enough to absorb
+# bursts from hundreds of devices while the writer is busy; the kernel caps
+# the granted size at net.core.rmem_max.
+RCVBUF_SIZE = 12 * 1024 * 1024
+
+# Largest possible UDP payload; one buffer of this size is reused per thread
+MAX_DATAGRAM = 65535
+
+
+def _tune_socket(sock: socket.socket):
+    """Enlarge the kernel receive buffer and log what was granted."""
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RCVBUF_SIZE)
+    except OSError as exc:
+        logger.warning("Could not set SO_RCVBUF: %s", exc)
+    granted = sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+    # Linux doubles the value for bookkeeping overhead and reports
+    # 2 * min(requested, rmem_max), so halve it to get the usable size
+    if sys.platform.startswith("linux"):
+        granted //= 2
+    logger.info("UDP receive buffer: %d bytes (requested %d)", granted, RCVBUF_SIZE)
+    if granted < RCVBUF_SIZE:
+        logger.warning(
+            "UDP receive buffer capped by the kernel; raise it with "
+            "'sysctl -w net.core.rmem_max=%d'", RCVBUF_SIZE)
+
+
+class SyslogReceiver:
+    """
+    UDP receiver running on dedicated threads.
 
-class SyslogProtocol(asyncio.DatagramProtocol):
-    """asyncio UDP protocol handler for incoming log messages."""
+    Each thread blocks in recvfrom_into() on its own socket with a reused
+    buffer and hands parsed entries to on_message directly, so intake is
+    independent of the asyncio loop serving the web UI. With workers > 1
+    the sockets share the port via SO_REUSEPORT and the kernel spreads
+    senders across them.
+    """
 
-    def __init__(self, on_message: Callable[[dict], None]):
+    def __init__(self, on_message: Callable[[LogEntry], None],
+                 host: str = "0.0.0.0", port: int = 5514, workers: int = 1):
         self.on_message = on_message
-        self.transport = None
-
-    def connection_made(self, transport):
-        self.transport = transport
-        logger.info("UDP syslog server is listening")
-
-    def datagram_received(self, data: bytes, addr: tuple):
-        source_ip, source_port = addr
-        try:
-            entry = parse_message(data, source_ip, source_port)
-            self.on_message(entry)
-        except Exception:
-            logger.exception("Error processing message from %s:%s", source_ip, source_port)
-
-    def error_received(self, exc):
-        logger.error("UDP error: %s", exc)
-
-    def connection_lost(self, exc):
-        if exc:
-            logger.error("UDP connection lost: %s", exc)
-
-
-async def start_syslog_server(
-    on_message: Callable[[dict], None],
+        self.host = host
+        self.port = port
+        if workers > 1 and not hasattr(socket, "SO_REUSEPORT"):
+            logger.warning("SO_REUSEPORT not supported here; using one UDP receiver")
+            workers = 1
+        self.workers = workers
+        self._sockets: list[socket.socket] = []
+        self._threads: list[threading.Thread] = []
+        self._stopping = False
+
+    def start(self):
+        # Resolve the bind address so IPv6 hosts such as "::" get an
+        # AF_INET6 socket
+        family, _, _, _, addr = socket.getaddrinfo(
+            self.host, self.port, type=socket.SOCK_DGRAM)[0]
+        for i in range(self.workers):
+            sock = socket.socket(family, socket.SOCK_DGRAM)
+            if self.workers > 1:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            _tune_socket(sock)
+            sock.bind(addr)
+            self._sockets.append(sock)
+            thread = threading.Thread(
+                target=self._recv_loop, args=(sock,),
+                name=f"fetchlog-udp-{i}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def close(self):
+        self._stopping = True
+        for sock in self._sockets:
+            try:
+                # Wakes a thread blocked in recvfrom_into() on Linux
+                sock.shutdown(socket.SHUT_RD)
+            except OSError:
+                pass
+        for thread in self._threads:
+            thread.join(1.0)
+        for sock in self._sockets:
+            sock.close()
+        self._sockets.clear()
+        self._threads.clear()
+
+    def _recv_loop(self, sock: socket.socket):
+        buf = bytearray(MAX_DATAGRAM)
+        view = memoryview(buf)
+        on_message = self.on_message
+        while True:
+            try:
+                n, addr = sock.recvfrom_into(buf)
+            except OSError as exc:
+                if self._stopping:
+                    return
+                logger.error("UDP error: %s", exc)
+                continue
+            if self._stopping:
+                return
+            source_ip, source_port = addr[0], addr[1]
+            try:
+                on_message(parse_message(view[:n], source_ip, source_port))
+            except Exception:
+                logger.exception("Error processing message from %s:%s", source_ip, source_port)
+
+
+def start_syslog_server_threaded(
+    on_message: Callable[[LogEntry], None],
     host: str = "0.0.0.0",
     port: int = 5514,
-    loop: Optional[asyncio.AbstractEventLoop] = None,
-) -> tuple[asyncio.DatagramTransport, SyslogProtocol]:
+    workers: int = 1,
+) -> SyslogReceiver:
     """
-    Start the UDP syslog server.
+    Start the UDP syslog server on dedicated receive threads.
 
     Args:
-        on_message: Callback invoked with each parsed log entry dict
+        on_message: Callback invoked with each parsed LogEntry, from a
+            receive thread (it must be thread-safe)
         host: Bind address (default 0.0.0.0 for all interfaces)
         port: UDP port to listen on (default 5514; use 514 if running as root)
-        loop: Event loop (uses current if None)
+        workers: Number of receive threads/sockets (SO_REUSEPORT when > 1)
 
     Returns:
-        Tuple of (transport, protocol)
+        The running SyslogReceiver; call close() to stop it
     """
-    if loop is None:
-        loop = asyncio.get_running_loop()
-
-    transport, protocol = await loop.create_datagram_endpoint(
-        lambda: SyslogProtocol(on_message),
-        local_addr=(host, port),
-    )
-
-    logger.info("Syslog UDP server started on %s:%d", host, port)
-    return transport, protocol
+    receiver = SyslogReceiver(on_message, host=host, port=port, workers=workers)
+    receiver.start()
+    logger.info("Syslog UDP server started on %s:%d (%d receive thread%s)",
+                host, port, receiver.workers, "" if receiver.workers == 1 else "s")
+    return receiver
@@ -10,27 +10,64 @@ Provides:
 
 import asyncio
 import csv
+import functools
 import io
 import logging
+from collections import deque
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from itertools import islice
 from typing import Optional
 
+import orjson
 from fastapi import FastAPI, Query, WebSocket, WebSocketDisconnect, Request
 from fastapi.responses import HTMLResponse, StreamingResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 
-from syslog_parser import SEVERITIES, FACILITIES, facility_name, severity_name
+from syslog_parser import SEVERITIES, FACILITIES, LogEntry, facility_name, severity_name
 
-app = FastAPI(title="FetchLog", version="1.0.0")
+# Coroutine function awaited when the web server shuts down (set from app.py).
+# uvicorn runs it before re-raising SIGTERM/SIGINT, unlike code placed after
+# server.serve(), which a service stop never reaches.
+shutdown_handler = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    if shutdown_handler is not None:
+        await shutdown_handler()
+
+
+app = FastAPI(title="FetchLog", version="1.0.0", lifespan=lifespan)
 app.mount("/static", StaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
 
 # Database instance (set from app.py) - works with either SQLite or PostgreSQL LogDatabase
 db = None
 
-# Connected WebSocket clients
-ws_clients: set[WebSocket] = set()
+# Connected WebSocket clients, each with its own bounded outgoing queue.
+# A slow client only loses its own oldest messages; it never stalls ingest.
+ws_clients: dict[WebSocket, asyncio.Queue] = {}
+WS_QUEUE_SIZE = 1000
+
+# Serialized entries handed over by the database writer thread, waiting to
+# be fanned out on the event loop. Bounded like the per-client queues.
+_pending_payloads: deque = deque(maxlen=10000)
+
+_dumps = orjson.dumps
+
+# Database writes from the web endpoints run here, off the event loop. One
+# thread keeps them on a single connection, as when they ran on the loop.
+_db_write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fetchlog-web-db")
+
+
+async def _run_db_write(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _db_write_executor, functools.partial(func, *args, **kwargs))
 
 
 def set_database(database):
@@ -38,22 +75,76 @@ def set_database(database):
     db = database
 
 
-async def broadcast_log(entry: dict):
-    """Send a new log entry to all connected WebSocket clients."""
-    global ws_clients
+def set_shutdown_handler(handler):
+    global shutdown_handler
+    shutdown_handler = handler
+
+
+def has_ws_clients() -> bool:
+    return bool(ws_clients)
+
+
+def serialize_entry(entry: LogEntry) -> bytes:
+    """Encode a stored LogEntry as the JSON sent to WebSocket clients."""
+    return _dumps(entry.to_dict())
+
+
+def broadcast_payload(payload: bytes):
+    """
+    Queue an already-serialized entry for all connected WebSocket clients.
+
+    Never waits on client I/O. Must run on the event loop thread; other
+    threads should use publish_payloads().
+    """
+    for q in ws_clients.values():
+        _enqueue(q, payload)
+
+
+def publish_payloads(payloads: list[bytes], loop: asyncio.AbstractEventLoop):
+    """
+    Broadcast serialized entries from another thread.
+
+    Schedules a single callback on the loop per call instead of one per
+    entry; the deque append/popleft pair needs no extra locking.
+    """
+    _pending_payloads.extend(payloads)
+    loop.call_soon_threadsafe(_drain_pending_payloads)
+
+
+def _drain_pending_payloads():
+    while _pending_payloads:
+        broadcast_payload(_pending_payloads.popleft())
+
+
+def broadcast_log(entry: dict):
+    """Queue a database row for all connected WebSocket clients."""
     if not ws_clients:
         return
-    # Enrich entry with human-readable fields
-    enriched = enrich_entry(entry)
-    dead = set()
-    for ws in ws_clients:
-        try:
-            await ws.send_json(enriched)
-        except Exception as e:
-            logging.getLogger("fetchlog.ws").debug(
-                "WebSocket send failed: %s", e)
-            dead.add(ws)
-    ws_clients -= dead
+    # Enrich entry with human-readable fields and serialize once for all clients
+    broadcast_payload(_dumps(enrich_entry(entry)))
+
+
+def _enqueue(q: asyncio.Queue, payload):
+    try:
+        q.put_nowait(payload)
+    except asyncio.QueueFull:
+        q.get_nowait()  # drop the oldest message for this client
+        q.put_nowait(payload)
+
+
+async def _ws_writer(ws: WebSocket, q: asyncio.Queue):
+    """Send queued messages to one client until it fails or disconnects."""
+    try:
+        while True:
+            payload = await q.get()
+            if isinstance(payload, str):
+                await ws.send_text(payload)
+            else:
+                await ws.send_bytes(payload)
+    except Exception as e:
+        logging.getLogger("fetchlog.ws").debug(
+            "WebSocket send failed: %s", e)
+        ws_clients.pop(ws, None)
 
 
 def enrich_entry(entry: dict) -> dict:
@@ -82,23 +173,31 @@ async def index(request: Request):
 @app.websocket("/ws")
 async def websocket_endpoint(ws: WebSocket):
     await ws.accept()
-    ws_clients.add(ws)
+    q: asyncio.Queue = asyncio.Queue(maxsize=WS_QUEUE_SIZE)
+    ws_clients[ws] = q
+    writer = asyncio.create_task(_ws_writer(ws, q))
     try:
         while True:
             # Keep connection alive; client can send ping/commands
             data = await ws.receive_text()
             if data == "ping":
-                await ws.send_text("pong")
+                # Replies go through the queue so only the writer task sends
+                _enqueue(q, "pong")
     except WebSocketDisconnect:
         pass
     finally:
-        ws_clients.discard(ws)
+        ws_clients.pop(ws, None)
+        writer.cancel()
 
 
 # ---------- REST API ----------
+# Read-only endpoints are plain functions so FastAPI runs them in its
+# threadpool, letting queries use the database read pool concurrently.
+# The write endpoints stay async because they broadcast on the event loop,
+# and hand their database calls to _db_write_executor instead.
 
 @app.get("/api/logs")
-async def get_logs(
+def get_logs(
     limit: int = Query(200, ge=1, le=5000),
     offset: int = Query(0, ge=0),
     source_ip: Optional[str] = None,
@@ -134,7 +233,7 @@ async def get_logs(
 
 
 @app.get("/api/hosts")
-async def get_hosts():
+def get_hosts():
     hosts = db.get_known_hosts()
     return {"hosts": hosts}
 
@@ -143,7 +242,7 @@ async def get_hosts():
 async def set_host_name(ip: str, request: Request):
     body = await request.json()
     name = body.get("display_name", "")
-    db.update_host_display_name(ip, name)
+    await _run_db_write(db.update_host_display_name, ip, name)
     return {"ok": True}
 
 
@@ -154,18 +253,25 @@ async def create_marker(request: Request):
     timestamp = body.get("timestamp")
     style = body.get("style", "default")
 
-    row_id = db.insert_marker(label, timestamp=timestamp, style=style)
+    row_id = await _run_db_write(db.insert_marker, label, timestamp=timestamp, style=style)
 
-    # Fetch the inserted entry and broadcast it
-    entries = db.get_entries_after(row_id - 1, limit=1)
+    # Fetch the inserted entry and broadcast it (broadcasting stays on the loop)
+    entries = await _run_db_write(db.get_entries_after, row_id - 1, limit=1)
     if entries:
-        await broadcast_log(entries[0])
+        broadcast_log(entries[0])
 
     return {"ok": True, "id": row_id}
 
 
+EXPORT_COLUMNS = (
+    "id", "timestamp", "received_at", "source_ip", "hostname",
+    "facility", "severity", "app_name", "message", "is_syslog", "is_marker",
+)
+EXPORT_CHUNK_ROWS = 1000
+
+
 @app.get("/api/export")
-async def export_csv(
+def export_csv(
     source_ip: Optional[str] = None,
     hostname: Optional[str] = None,
     severity: Optional[int] = Query(None, ge=0, le=7),
@@ -177,8 +283,8 @@ async def export_csv(
     include_markers: bool = True,
     limit: int = Query(10000, ge=1, le=100000),
 ):
-    entries = db.query_logs(
-        limit=limit, offset=0,
+    rows = db.iter_logs(
+        EXPORT_COLUMNS, limit=limit,
         source_ip=source_ip, hostname=hostname,
         severity=severity, search=search,
         start_time=start_time, end_time=end_time,
@@ -186,34 +292,44 @@ async def export_csv(
         include_markers=include_markers,
     )
 
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow([
-        "ID", "Timestamp", "Received At", "Source IP", "Hostname",
-        "Facility", "Severity", "App Name", "Message", "Is Syslog", "Is Marker"
-    ])
-    for e in entries:
-        fac = facility_name(e["facility"]) if e.get("facility") is not None else ""
-        sev = severity_name(e["severity"]) if e.get("severity") is not None else ""
+    def generate():
+        output = io.StringIO()
+        writer = csv.writer(output)
         writer.writerow([
-            e["id"], e["timestamp"], e["received_at"], e["source_ip"],
-            e.get("hostname", ""), fac, sev,
-            e.get("app_name", ""), e["message"],
-            "Yes" if e["is_syslog"] else "No",
-            "Yes" if e["is_marker"] else "No",
+            "ID", "Timestamp", "Received At", "Source IP", "Hostname",
+            "Facility", "Severity", "App Name", "Message", "Is Syslog", "Is Marker"
         ])
+        # One writerows() call per chunk saves a writerow() call per row; the
+        # row tuples themselves are still built in Python
+        while True:
+            chunk = list(islice(rows, EXPORT_CHUNK_ROWS))
+            if not chunk:
+                break
+            writer.writerows(
+                (row_id, ts, received, ip, host,
+                 facility_name(fac) if fac is not None else "",
+                 severity_name(sev) if sev is not None else "",
+                 app_name, message,
+                 "Yes" if is_syslog else "No",
+                 "Yes" if is_marker else "No")
+                for (row_id, ts, received, ip, host, fac, sev,
+                     app_name, message, is_syslog, is_marker) in chunk
+            )
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate()
+        yield output.getvalue()
 
-    output.seek(0)
     timestamp_str = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
     return StreamingResponse(
-        iter([output.getvalue()]),
+        generate(),
         media_type="text/csv",
         headers={"Content-Disposition": f"attachment; filename=logs_export_{timestamp_str}.csv"},
     )
 
 
 @app.get("/api/stats")
-async def get_stats():
+def get_stats():
     total = db.count_logs()
     hosts = db.get_known_hosts()
     return {